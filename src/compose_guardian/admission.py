@@ -0,0 +1,178 @@
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HostLoad:
+    # load1 normalized by CPU count; None when unavailable.
+    load_per_cpu: Optional[float] = None
+    # PSI "some avg10" percentages; None when the kernel has no PSI.
+    memory_pressure: Optional[float] = None
+    io_pressure: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "load_per_cpu": self.load_per_cpu,
+            "memory_pressure": self.memory_pressure,
+            "io_pressure": self.io_pressure,
+        }
+
+
+def _env_number(name: str, default: Optional[float]) -> Optional[float]:
+    # A malformed value is logged and ignored rather than raised, so a typo
+    # cannot take down the scheduler loop.
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        logger.error(f"{name}={raw!r} 不是有效的数字，已忽略（默认值: {default}）")
+        return default
+    if value < 0:
+        logger.error(f"{name}={raw!r} 不能为负数，已忽略（默认值: {default}）")
+        return default
+    return value
+
+
+def _proc_root() -> str:
+    return os.getenv("ADMISSION_PROC_ROOT", "/proc").strip() or "/proc"
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="ascii") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_load_per_cpu(proc: str) -> Optional[float]:
+    raw = _read_text(os.path.join(proc, "loadavg"))
+    if not raw:
+        return None
+    try:
+        load1 = float(raw.split()[0])
+    except (IndexError, ValueError):
+        return None
+    return load1 / (os.cpu_count() or 1)
+
+
+def _read_pressure(proc: str, resource: str) -> Optional[float]:
+    # Format: "some avg10=0.00 avg60=0.00 avg300=0.00 total=0"
+    raw = _read_text(os.path.join(proc, "pressure", resource))
+    if not raw:
+        return None
+    for line in raw.splitlines():
+        parts = line.split()
+        if not parts or parts[0] != "some":
+            continue
+        for kv in parts[1:]:
+            k, _, v = kv.partition("=")
+            if k == "avg10":
+                try:
+                    return float(v)
+                except ValueError:
+                    return None
+    return None
+
+
+def read_host_load() -> HostLoad:
+    proc = _proc_root()
+    return HostLoad(
+        load_per_cpu=_read_load_per_cpu(proc),
+        memory_pressure=_read_pressure(proc, "memory"),
+        io_pressure=_read_pressure(proc, "io"),
+    )
+
+
+@dataclass
+class AdmissionConfig:
+    max_load_per_cpu: Optional[float] = None
+    max_memory_pressure: Optional[float] = None
+    max_io_pressure: Optional[float] = None
+    retry_seconds: float = 30
+    budget_seconds: float = 600
+    recreate_interval_seconds: float = 30
+
+    @property
+    def enabled(self) -> bool:
+        return any(v is not None for v in self.thresholds().values())
+
+    def thresholds(self) -> Dict[str, Optional[float]]:
+        return {
+            "load_per_cpu": self.max_load_per_cpu,
+            "memory_pressure": self.max_memory_pressure,
+            "io_pressure": self.max_io_pressure,
+        }
+
+
+def load_admission_config() -> AdmissionConfig:
+    return AdmissionConfig(
+        max_load_per_cpu=_env_number("ADMISSION_MAX_LOAD_PER_CPU", None),
+        max_memory_pressure=_env_number("ADMISSION_MAX_MEMORY_PRESSURE", None),
+        max_io_pressure=_env_number("ADMISSION_MAX_IO_PRESSURE", None),
+        retry_seconds=max(1, _env_number("ADMISSION_RETRY_SECONDS", 30)),
+        budget_seconds=_env_number("ADMISSION_DEADLINE_SECONDS", 600),
+        recreate_interval_seconds=_env_number(
+            "ADMISSION_RECREATE_INTERVAL_SECONDS", 30
+        ),
+    )
+
+
+@dataclass
+class AdmissionBudget:
+    # Seconds the run may still spend waiting for load to drop. Shared by all
+    # stacks so an overloaded host delays a run by at most the budget.
+    remaining: float
+
+
+def check_admission(config: AdmissionConfig, load: HostLoad) -> Tuple[bool, str]:
+    # Metrics that cannot be read (no PSI, no /proc) never block admission.
+    values = load.as_dict()
+    over: List[str] = []
+    for key, limit in config.thresholds().items():
+        value = values.get(key)
+        if limit is None or value is None:
+            continue
+        if value > limit:
+            over.append(f"{key}={value:.2f}>{limit:g}")
+    if over:
+        return False, "host overloaded: " + ", ".join(over)
+    return True, "ok"
+
+
+def wait_for_admission(
+    config: AdmissionConfig, budget: AdmissionBudget, stage: str
+) -> Dict[str, Any]:
+    """Block until host load is under the configured thresholds.
+
+    Time spent waiting is charged to ``budget``. Returns a record suitable
+    for ``Report.admission``; ``admitted`` is False when the load was still
+    too high once the budget ran out. With no budget left the host is
+    sampled once without waiting.
+    """
+    start = time.time()
+    attempts = 0
+    while True:
+        attempts += 1
+        load = read_host_load()
+        ok, why = check_admission(config, load)
+        waited = time.time() - start
+        if ok or waited >= budget.remaining:
+            budget.remaining = max(0.0, budget.remaining - waited)
+            return {
+                "stage": stage,
+                "admitted": ok,
+                "attempts": attempts,
+                "waited_seconds": round(waited, 1),
+                "reason": why,
+                "host_load": load.as_dict(),
+            }
+        logger.info(f"主机负载过高，{config.retry_seconds:g}s 后重试 ({stage}): {why}")
+        time.sleep(min(config.retry_seconds, budget.remaining - waited))
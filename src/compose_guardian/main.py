@@ -1,10 +1,12 @@
 import logging
 import os
+import sys
 import time
 from datetime import datetime, timezone
 
 from croniter import croniter
 
+from .plan import run_plan
 from .updater import run_once
 
 # 配置日志
@@ -38,6 +40,10 @@ def main() -> None:
     schedule_cron = os.getenv("SCHEDULE_CRON", "").strip()
     schedule_every = os.getenv("SCHEDULE_EVERY", "").strip()
 
+    if os.getenv("PLAN_ONLY", "").strip().lower() in ("1", "true", "yes"):
+        # Check-only: report pending updates, never pull or recreate.
+        sys.exit(run_plan())
+
     logger.info("Compose Guardian 启动")
     
     if not schedule_cron and not schedule_every:
@@ -0,0 +1,359 @@
+import base64
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from .updater import (
+    _compose,
+    _discover_compose_files,
+    _docker,
+    _get_services_images,
+    _ignore_set,
+    _stack_name,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Exit codes follow `terraform plan -detailed-exitcode`.
+EXIT_NO_UPDATES = 0
+EXIT_ERROR = 1
+EXIT_UPDATES_PENDING = 2
+
+DOCKER_HUB_REGISTRY = "registry-1.docker.io"
+DOCKER_HUB_AUTH_KEY = "https://index.docker.io/v1/"
+
+MANIFEST_ACCEPT = ", ".join(
+    [
+        "application/vnd.oci.image.index.v1+json",
+        "application/vnd.docker.distribution.manifest.list.v2+json",
+        "application/vnd.oci.image.manifest.v1+json",
+        "application/vnd.docker.distribution.manifest.v2+json",
+    ]
+)
+
+
+def _parse_image_ref(image: str) -> Tuple[str, str, str, str]:
+    # Returns (registry, repository, tag, digest); tag defaults to "latest".
+    name, _, digest = image.partition("@")
+    tag = ""
+    slash = name.rfind("/")
+    colon = name.rfind(":")
+    if colon > slash:
+        name, tag = name[:colon], name[colon + 1 :]
+
+    first, _, rest = name.partition("/")
+    if rest and ("." in first or ":" in first or first == "localhost"):
+        registry, repo = first, rest
+    else:
+        registry, repo = DOCKER_HUB_REGISTRY, name
+    if registry in ("docker.io", "index.docker.io"):
+        registry = DOCKER_HUB_REGISTRY
+    if registry == DOCKER_HUB_REGISTRY and "/" not in repo:
+        repo = f"library/{repo}"
+
+    return registry, repo, tag or "latest", digest
+
+
+def _local_digests(image: str) -> List[str]:
+    # RepoDigests records the digests the local image was pulled by; one image
+    # can carry several for the same repository.
+    p = _docker(["image", "inspect", "-f", "{{json .RepoDigests}}", image], check=False)
+    if p.returncode != 0:
+        raise RuntimeError(f"docker image inspect failed: {(p.stderr or '').strip()}")
+    digests = json.loads((p.stdout or "").strip() or "null") or []
+
+    registry, repo, _, _ = _parse_image_ref(image)
+    out: List[str] = []
+    for entry in digests:
+        r_registry, r_repo, _, r_digest = _parse_image_ref(entry)
+        if (r_registry, r_repo) == (registry, repo) and r_digest:
+            out.append(r_digest)
+    return out
+
+
+def _registry_credentials(registry: str) -> Optional[Tuple[str, str]]:
+    # Only plain `auths` entries are supported, not credential helpers.
+    cfg_dir = os.getenv("DOCKER_CONFIG", "").strip() or os.path.expanduser("~/.docker")
+    try:
+        with open(os.path.join(cfg_dir, "config.json"), "r", encoding="utf-8") as f:
+            auths = (json.load(f) or {}).get("auths") or {}
+    except (OSError, ValueError):
+        return None
+
+    keys = [registry, f"https://{registry}", f"https://{registry}/v1/"]
+    if registry == DOCKER_HUB_REGISTRY:
+        keys.insert(0, DOCKER_HUB_AUTH_KEY)
+    for key in keys:
+        raw = (auths.get(key) or {}).get("auth")
+        if not raw:
+            continue
+        try:
+            user, _, password = base64.b64decode(raw).decode("utf-8").partition(":")
+        except ValueError:
+            continue
+        return user, password
+    return None
+
+
+def _parse_challenge(header: str) -> Tuple[str, Dict[str, str]]:
+    # e.g. Bearer realm="https://auth.docker.io/token",service="registry.docker.io"
+    scheme, _, params = header.strip().partition(" ")
+    return scheme.lower(), dict(re.findall(r'(\w+)="([^"]*)"', params))
+
+
+def _insecure_registries() -> set:
+    raw = os.getenv("PLAN_INSECURE_REGISTRIES", "").strip()
+    return {p.strip() for p in raw.split(",") if p.strip()}
+
+
+def _registry_schemes(registry: str) -> List[str]:
+    # Like dockerd: loopback and explicitly insecure registries fall back to
+    # plain HTTP when HTTPS cannot be reached.
+    host = registry.rsplit(":", 1)[0] if registry.count(":") == 1 else registry
+    loopback = host in ("localhost", "::1") or host.startswith("127.")
+    if loopback or registry in _insecure_registries():
+        return ["https", "http"]
+    return ["https"]
+
+
+class _RegistryClient:
+    """Registry lookups shared by the plan's worker threads.
+
+    Each thread gets its own ``requests.Session``; bearer tokens are cached
+    per ``(realm, scope)`` so repeated repositories authenticate once.
+    """
+
+    def __init__(self) -> None:
+        self.timeout = int(os.getenv("PLAN_TIMEOUT_SECONDS", "10"))
+        self._local = threading.local()
+        self._sessions: List[requests.Session] = []
+        self._tokens: Dict[Tuple[str, str], str] = {}
+        self._token_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+
+    def _token(
+        self, params: Dict[str, str], repo: str, creds: Optional[Tuple[str, str]]
+    ) -> str:
+        scope = params.get("scope") or f"repository:{repo}:pull"
+        key = (params["realm"], scope)
+        with self._lock:
+            key_lock = self._token_locks.setdefault(key, threading.Lock())
+
+        # Hold the per-key lock while fetching so concurrent lookups of the
+        # same repository wait for one token request instead of racing.
+        with key_lock:
+            cached = self._tokens.get(key)
+            if cached is not None:
+                return cached
+
+            query = {"scope": scope}
+            if params.get("service"):
+                query["service"] = params["service"]
+            t = self.session().get(
+                params["realm"], params=query, auth=creds, timeout=self.timeout
+            )
+            t.raise_for_status()
+            body = t.json()
+            token = body.get("token") or body.get("access_token") or ""
+            self._tokens[key] = token
+            return token
+
+    def _head_manifest(
+        self, url: str, repo: str, creds: Optional[Tuple[str, str]]
+    ) -> requests.Response:
+        session = self.session()
+        headers = {"Accept": MANIFEST_ACCEPT}
+        r = session.head(url, headers=headers, timeout=self.timeout)
+        if r.status_code == 401:
+            scheme, params = _parse_challenge(r.headers.get("WWW-Authenticate", ""))
+            if scheme == "bearer" and params.get("realm"):
+                headers["Authorization"] = f"Bearer {self._token(params, repo, creds)}"
+                r = session.head(url, headers=headers, timeout=self.timeout)
+            elif scheme == "basic" and creds:
+                r = session.head(url, headers=headers, auth=creds, timeout=self.timeout)
+        return r
+
+    def remote_digest(self, image: str) -> str:
+        registry, repo, tag, _ = _parse_image_ref(image)
+        creds = _registry_credentials(registry)
+        schemes = _registry_schemes(registry)
+
+        for i, scheme in enumerate(schemes):
+            url = f"{scheme}://{registry}/v2/{repo}/manifests/{tag}"
+            try:
+                r = self._head_manifest(url, repo, creds)
+                break
+            except requests.exceptions.ConnectionError:
+                # SSLError is a ConnectionError too; try the next scheme.
+                if i == len(schemes) - 1:
+                    raise
+
+        r.raise_for_status()
+        digest = r.headers.get("Docker-Content-Digest", "")
+        if not digest:
+            raise RuntimeError(f"registry returned no digest for {image}")
+        return digest
+
+
+def _lookup_image(image: str, client: _RegistryClient) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "image": image,
+        "current_digest": "",
+        "available_digest": "",
+        "update_available": None,
+    }
+    try:
+        _, _, _, pinned = _parse_image_ref(image)
+        local = _local_digests(image)
+        out["current_digest"] = local[0] if local else ""
+        if pinned:
+            # Pinned by digest: compose will never move to another image.
+            out["available_digest"] = pinned
+            out["update_available"] = False
+            return out
+        available = client.remote_digest(image)
+        out["available_digest"] = available
+        if local:
+            # Same rule as run_once: no update if the image we already have
+            # is the one the tag points at, whichever digest it was pulled by.
+            out["update_available"] = available not in local
+            if available in local:
+                out["current_digest"] = available
+        else:
+            out["message"] = "no local repo digest (image not pulled from a registry)"
+    except Exception as e:
+        out["error"] = f"{type(e).__name__}: {e}"
+    return out
+
+
+def _scan_stack(compose_file: str, ignore: set) -> Dict[str, Any]:
+    stack: Dict[str, Any] = {
+        "stack": _stack_name(compose_file),
+        "compose_file": compose_file,
+        "status": "",
+        "message": "",
+        "services": {},
+    }
+    try:
+        # Unlike _stack_is_up, treat a failing `ps` (e.g. daemon unreachable)
+        # as an error so it cannot pass as "nothing to update".
+        p = _compose(compose_file, ["ps", "-q", "--status", "running"], check=False)
+        if p.returncode != 0:
+            raise RuntimeError(f"docker compose ps failed: {(p.stderr or '').strip()}")
+        if not (p.stdout or "").strip():
+            stack["status"] = "SKIPPED"
+            stack["message"] = "stack not up (no running containers)"
+            return stack
+        images = _get_services_images(compose_file)
+        stack["services"] = {
+            svc: {"image": img} for svc, img in images.items() if svc not in ignore
+        }
+        if not stack["services"]:
+            stack["status"] = "SKIPPED"
+            stack["message"] = "no services with image after applying ignore list"
+    except Exception as e:
+        stack["status"] = "ERROR"
+        stack["message"] = f"exception: {type(e).__name__}: {e}"
+    return stack
+
+
+def build_plan(root: str) -> Dict[str, Any]:
+    workers = max(1, int(os.getenv("PLAN_CONCURRENCY", "16")))
+    ignore = _ignore_set()
+    compose_files = _discover_compose_files(root)
+    logger.info(f"计划模式: 发现 {len(compose_files)} 个 compose 文件，根目录: {root}")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        stacks = list(pool.map(lambda f: _scan_stack(f, ignore), compose_files))
+
+        # Several stacks often share an image; look each one up only once.
+        images = sorted(
+            {
+                svc["image"]
+                for s in stacks
+                if not s["status"]
+                for svc in s["services"].values()
+            }
+        )
+        client = _RegistryClient()
+        try:
+            results = dict(
+                zip(images, pool.map(lambda i: _lookup_image(i, client), images))
+            )
+        finally:
+            client.close()
+
+    for s in stacks:
+        if s["status"]:
+            continue
+        for svc in list(s["services"]):
+            s["services"][svc] = dict(results[s["services"][svc]["image"]])
+        entries = s["services"]
+        failed = [svc for svc, e in entries.items() if "error" in e]
+        unknown = [svc for svc, e in entries.items() if e["update_available"] is None]
+        # Errors win over updates so a CI gate never mistakes a partial
+        # lookup for a complete plan.
+        if failed:
+            s["status"] = "ERROR"
+            s["message"] = "registry lookup failed for: %s" % ",".join(failed)
+        elif any(e["update_available"] for e in entries.values()):
+            s["status"] = "UPDATE_AVAILABLE"
+        elif unknown:
+            s["status"] = "UNKNOWN"
+            s["message"] = "no local repo digest for: %s" % ",".join(unknown)
+        else:
+            s["status"] = "UP_TO_DATE"
+
+    return {
+        "timestamp": datetime.now().strftime("%Y%m%dT%H%M%S"),
+        "compose_root": root,
+        "updates_pending": any(
+            e.get("update_available") for s in stacks for e in s["services"].values()
+        ),
+        "stacks": stacks,
+    }
+
+
+def run_plan() -> int:
+    root = os.getenv("COMPOSE_ROOT", "/compose/projects").strip() or "/compose/projects"
+    plan = build_plan(root)
+    if not plan["stacks"]:
+        logger.warning(f"未找到任何 compose 文件，COMPOSE_ROOT={root}")
+
+    json.dump(plan, sys.stdout, indent=2, ensure_ascii=True)
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+
+    failed = any(
+        s["status"] == "ERROR" or any("error" in e for e in s["services"].values())
+        for s in plan["stacks"]
+    )
+    if failed or not plan["stacks"]:
+        return EXIT_ERROR
+    if plan["updates_pending"]:
+        return EXIT_UPDATES_PENDING
+    return EXIT_NO_UPDATES
@@ -15,6 +15,8 @@ class Report:
 
     ignored_services: List[str] = field(default_factory=list)
 
+    admission: List[Dict[str, Any]] = field(default_factory=list)
+
     services: Dict[str, Dict[str, Any]] = field(default_factory=dict)
 
     before_image_ids: Dict[str, str] = field(default_factory=dict)
@@ -43,6 +45,7 @@ def write_report(report: Report) -> str:
         "status": report.status,
         "message": report.message,
         "ignored_services": report.ignored_services,
+        "admission": report.admission,
         "services": report.services,
         "before_image_ids": report.before_image_ids,
         "after_image_ids": report.after_image_ids,
@@ -6,6 +6,12 @@ import time
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+from .admission import (
+    AdmissionBudget,
+    AdmissionConfig,
+    load_admission_config,
+    wait_for_admission,
+)
 from .reporting import Report, write_report
 
 # 配置日志
@@ -245,7 +251,25 @@ def _dingtalk_send(title: str, text: str) -> None:
         return
 
 
-def _run_once_for_compose(compose_file: str) -> Report:
+def _admit(
+    report: Report, stage: str, config: AdmissionConfig, budget: AdmissionBudget
+) -> bool:
+    # Wait while host load stays above the configured thresholds.
+    if not config.enabled:
+        return True
+    rec = wait_for_admission(config, budget, stage)
+    report.admission.append(rec)
+    if rec["admitted"]:
+        return True
+    logger.warning(
+        f"推迟 {_stack_name(report.compose_file)} ({stage}): 等待 {rec['waited_seconds']}s 后主机负载仍过高 ({rec['reason']})"
+    )
+    return False
+
+
+def _run_once_for_compose(
+    compose_file: str, config: AdmissionConfig, budget: AdmissionBudget
+) -> Report:
     ignore = _ignore_set()
     ts_compact = datetime.now().strftime("%Y%m%dT%H%M%S")
     stack = _stack_name(compose_file)
@@ -289,6 +313,12 @@ def _run_once_for_compose(compose_file: str) -> Report:
         }
         report.before_image_ids = before_ids
 
+        if not _admit(report, "pull", config, budget):
+            report.status = "DEFERRED"
+            report.message = f"deferred before pull: {report.admission[-1]['reason']}"
+            write_report(report)
+            return report
+
         logger.info(f"正在拉取最新镜像...")
         _compose(compose_file, ["pull"], check=False)
 
@@ -326,8 +356,9 @@ def _run_once_for_compose(compose_file: str) -> Report:
             write_report(report)
             return report
 
-        # Backup old images for changed services.
         logger.info(f"检测到 {len(changed)} 个服务需要更新: {', '.join(changed)}")
+
+        # Backup old images for changed services.
         backups: Dict[str, str] = {}
         for svc in changed:
             img = services_images[svc]
@@ -341,12 +372,48 @@ def _run_once_for_compose(compose_file: str) -> Report:
         report.backup_tags = backups
 
         # Apply update for changed services only.
-        logger.info(f"正在更新服务: {', '.join(changed)}")
-        _compose(
-            compose_file,
-            ["up", "-d", "--force-recreate", "--no-deps"] + changed,
-            check=False,
-        )
+        deferred: List[str] = []
+        if config.enabled:
+            # Throttle: recreate one service at a time. Load averages lag, so
+            # give the previous service time to start before sampling again.
+            for i, svc in enumerate(changed):
+                if i and config.recreate_interval_seconds:
+                    time.sleep(config.recreate_interval_seconds)
+                if not _admit(report, f"recreate {svc}", config, budget):
+                    deferred = changed[i:]
+                    break
+                logger.info(f"正在更新服务: {svc}")
+                _compose(
+                    compose_file,
+                    ["up", "-d", "--force-recreate", "--no-deps", svc],
+                    check=False,
+                )
+        else:
+            logger.info(f"正在更新服务: {', '.join(changed)}")
+            _compose(
+                compose_file,
+                ["up", "-d", "--force-recreate", "--no-deps"] + changed,
+                check=False,
+            )
+
+        if deferred:
+            # Point the tags back at the running images so the next run
+            # detects the same update again instead of seeing no change.
+            for svc in deferred:
+                _docker(["image", "tag", before_ids[svc], services_images[svc]], check=False)
+                btag = backups.pop(svc, None)
+                if btag:
+                    _docker(["image", "rm", btag], check=False)
+            changed = changed[: len(changed) - len(deferred)]
+            report.changed_services = changed
+            report.message = "deferred before recreate: %s (%s)" % (
+                ",".join(deferred),
+                report.admission[-1]["reason"],
+            )
+            if not changed:
+                report.status = "DEFERRED"
+                write_report(report)
+                return report
 
         logger.info(f"正在验证服务健康状态...")
         ok, why = _verify_services(compose_file, changed)
@@ -432,8 +499,10 @@ def run_once() -> None:
         logger.info(
             f"发现 {len(compose_files)} 个 compose 文件: {[os.path.basename(f) for f in compose_files]}"
         )
+        config = load_admission_config()
+        budget = AdmissionBudget(remaining=config.budget_seconds)
         for compose_file in compose_files:
-            reports.append(_run_once_for_compose(compose_file))
+            reports.append(_run_once_for_compose(compose_file, config, budget))
 
     logger.info("所有 compose 文件处理完成")
 
@@ -476,6 +545,7 @@ def _summary_title(reports: List[Report]) -> str:
     rollback = sum(1 for r in reports if r.status == "ROLLBACK")
     failed = sum(1 for r in reports if r.status == "FAILED")
     skipped = sum(1 for r in reports if r.status == "SKIPPED")
+    deferred = sum(1 for r in reports if r.status == "DEFERRED")
 
     total = len(reports)
     if failed:
@@ -484,10 +554,12 @@ def _summary_title(reports: List[Report]) -> str:
         overall = "ROLLBACK"
     elif ok:
         overall = "SUCCESS"
+    elif deferred:
+        overall = "DEFERRED"
     else:
         overall = "SKIPPED"
 
-    return f"Compose Guardian Run {overall} ({ts}) total={total} ok={ok} rollback={rollback} failed={failed} skipped={skipped}"
+    return f"Compose Guardian Run {overall} ({ts}) total={total} ok={ok} rollback={rollback} failed={failed} deferred={deferred} skipped={skipped}"
 
 
 def _format_dingtalk_summary(reports: List[Report]) -> str:
@@ -498,6 +570,7 @@ def _format_dingtalk_summary(reports: List[Report]) -> str:
     rb = [r for r in reports if r.status == "ROLLBACK"]
     failed = [r for r in reports if r.status == "FAILED"]
     skipped = [r for r in reports if r.status == "SKIPPED"]
+    deferred = [r for r in reports if r.status == "DEFERRED"]
 
     # 状态中文映射
     status_map = {
@@ -505,6 +578,7 @@ def _format_dingtalk_summary(reports: List[Report]) -> str:
         "FAILED": "失败",
         "ROLLBACK": "已回滚",
         "SKIPPED": "无更新",
+        "DEFERRED": "已推迟",
     }
 
     if failed:
@@ -513,14 +587,16 @@ def _format_dingtalk_summary(reports: List[Report]) -> str:
         overall = "已回滚"
     elif ok:
         overall = "成功"
+    elif deferred:
+        overall = "已推迟"
     else:
         overall = "无更新"
 
     lines.append(f"### 运行摘要: {overall}")
     lines.append("")
     lines.append(
-        "- 统计: 成功=%d, 回滚=%d, 失败=%d, 无更新=%d"
-        % (len(ok), len(rb), len(failed), len(skipped))
+        "- 统计: 成功=%d, 回滚=%d, 失败=%d, 推迟=%d, 无更新=%d"
+        % (len(ok), len(rb), len(failed), len(deferred), len(skipped))
     )
 
     # 过滤掉 SKIPPED 状态的报告，只显示有实际变化的